@@ -1,16 +1,40 @@
 from __future__ import annotations
 
 import json
+import queue
 import re
-import uuid
+import secrets
+import threading
+import traceback
+from bisect import bisect_left
 from dataclasses import dataclass
-from typing import Dict, List, Tuple, Optional
+from functools import cached_property
+from typing import Dict, List, Tuple, Optional, Set
 
 import streamlit as st
 from sqlalchemy import text
 
 
+# ===================== JSON (orjson optional) =====================
+try:
+    import orjson  # pip install orjson
+
+    def json_loads(s):
+        return orjson.loads(s)
+
+    def json_dumps(obj) -> str:
+        # orjson always emits UTF-8 (no ascii escaping), same as ensure_ascii=False
+        return orjson.dumps(obj).decode("utf-8")
+except Exception:
+    def json_loads(s):
+        return json.loads(s)
+
+    def json_dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+
 # ===================== DB =====================
+@st.cache_resource
 def get_conn():
     # Streamlit Cloud -> Settings -> Secrets: DB_URL = "postgresql+psycopg2://..."
     return st.connection("postgresql", type="sql", url=st.secrets["DB_URL"])
@@ -45,6 +69,28 @@ GLOBAL_STEPS: List[Tuple[str, str]] = [
     ("eksikler_tamamlandi", "Eksik olduğu tespit edilen popüler eserlerin temin edilmesi"),
 ]
 
+# bare keys, for loops that don't need the labels
+VARIANT_KEYS: Tuple[str, ...] = tuple(k for k, _ in VARIANTS)
+COLUMN_STEP_KEYS: Tuple[str, ...] = tuple(k for k, _ in COLUMN_STEPS)
+GLOBAL_STEP_KEYS: Tuple[str, ...] = tuple(k for k, _ in GLOBAL_STEPS)
+
+# Every step has a fixed bit in ArtistProgress.mask: globals first (variant None), then variant x step.
+BIT_INDEX: Dict[Tuple[Optional[str], str], int] = {
+    slot: i
+    for i, slot in enumerate(
+        [(None, gk) for gk in GLOBAL_STEP_KEYS]
+        + [(vk, sk) for vk in VARIANT_KEYS for sk in COLUMN_STEP_KEYS]
+    )
+}
+TOTAL_BITS = len(BIT_INDEX)
+ALL_BITS = (1 << TOTAL_BITS) - 1
+
+# cards rendered per page; each card is ~70 widgets, so the page size bounds the rerun payload
+PAGE_SIZE = 10
+
+# order_num values are spaced out so a move can usually take a free slot between its neighbours
+ORDER_GAP = 1024
+
 
 # ===================== Utils =====================
 def force_rerun() -> None:
@@ -54,6 +100,15 @@ def force_rerun() -> None:
         st.experimental_rerun()
 
 
+def fragment(fn):
+    # checkbox clicks inside a fragment rerun only that fragment, not the whole script
+    if hasattr(st, "fragment"):
+        return st.fragment(fn)
+    if hasattr(st, "experimental_fragment"):
+        return st.experimental_fragment(fn)
+    return fn
+
+
 def toast(msg: str) -> None:
     if hasattr(st, "toast"):
         st.toast(msg)
@@ -61,9 +116,15 @@ def toast(msg: str) -> None:
         st.success(msg)
 
 
+_WS_RE = re.compile(r"\s+")
+
+
 def norm(s: str) -> str:
     s = (s or "").strip()
-    s = re.sub(r"\s+", " ", s)
+    # common case: only single ASCII spaces (isprintable() is False for every other whitespace char)
+    if "  " not in s and s.isprintable():
+        return s.lower()
+    s = _WS_RE.sub(" ", s)
     return s.lower()
 
 
@@ -73,12 +134,8 @@ def checkbox_key(artist_id: str, variant_key: Optional[str], step_key: str) -> s
     return f"{artist_id}__{variant_key}__{step_key}"
 
 
-def empty_variant_steps() -> Dict[str, bool]:
-    return {k: False for k, _ in COLUMN_STEPS}
-
-
-def empty_global_steps() -> Dict[str, bool]:
-    return {k: False for k, _ in GLOBAL_STEPS}
+# checkbox_key(aid, vk, sk) == aid + CHECKBOX_KEY_SUFFIXES[BIT_INDEX[(vk, sk)]]
+CHECKBOX_KEY_SUFFIXES: Tuple[str, ...] = tuple(checkbox_key("", vk, sk) for vk, sk in BIT_INDEX)
 
 
 def ensure_checkbox_state(key: str, default_val: bool) -> None:
@@ -86,18 +143,46 @@ def ensure_checkbox_state(key: str, default_val: bool) -> None:
         st.session_state[key] = default_val
 
 
-def set_artist_all_session_state(artist_id: str, value: bool) -> None:
-    for gk, _ in GLOBAL_STEPS:
-        st.session_state[checkbox_key(artist_id, None, gk)] = value
-    for vk, _ in VARIANTS:
-        for sk, _ in COLUMN_STEPS:
-            st.session_state[checkbox_key(artist_id, vk, sk)] = value
+def set_artist_all_session_state(ap: "ArtistProgress", value: bool) -> None:
+    st.session_state.update(dict.fromkeys(ap.checkbox_keys, value))
+
+
+def set_delete_confirm(artist_id: str, value: bool) -> None:
+    if value:
+        st.session_state[f"del_confirm_{artist_id}"] = True
+    else:
+        st.session_state.pop(f"del_confirm_{artist_id}", None)
 
 
 def bump_sort_key() -> None:
     st.session_state["artist_sort_key_v"] = int(st.session_state.get("artist_sort_key_v", 0)) + 1
 
 
+def mask_from_steps(global_steps: Dict, variants: Dict) -> int:
+    mask = 0
+    for gk in GLOBAL_STEP_KEYS:
+        if global_steps.get(gk, False):
+            mask |= 1 << BIT_INDEX[(None, gk)]
+    for vk in VARIANT_KEYS:
+        steps_in = variants.get(vk)
+        if not isinstance(steps_in, dict):
+            continue
+        for sk in COLUMN_STEP_KEYS:
+            if steps_in.get(sk, False):
+                mask |= 1 << BIT_INDEX[(vk, sk)]
+    return mask
+
+
+def steps_from_mask(mask: int) -> Tuple[Dict[str, bool], Dict[str, Dict[str, bool]]]:
+    # built straight from the bits (no empty-template dicts to copy and overwrite)
+    global_steps = {gk: bool(mask >> BIT_INDEX[(None, gk)] & 1) for gk in GLOBAL_STEP_KEYS}
+    variants = {
+        vk: {sk: bool(mask >> BIT_INDEX[(vk, sk)] & 1) for sk in COLUMN_STEP_KEYS}
+        for vk in VARIANT_KEYS
+    }
+    return global_steps, variants
+
+
 def _safe_json_to_dict(x) -> Dict:
     if x is None:
         return {}
@@ -105,7 +190,7 @@ def _safe_json_to_dict(x) -> Dict:
         return x
     if isinstance(x, str):
         try:
-            v = json.loads(x)
+            v = json_loads(x)
             return v if isinstance(v, dict) else {}
         except Exception:
             return {}
@@ -118,26 +203,81 @@ class ArtistProgress:
     id: str
     label: str
     order: int
-    global_steps: Dict[str, bool]
-    variants: Dict[str, Dict[str, bool]]
+    mask: int = 0  # done steps, see BIT_INDEX; the DB keeps the global_steps/variants dicts
 
     @staticmethod
     def new(label: str, order: int) -> "ArtistProgress":
-        artist_id = uuid.uuid4().hex
-        variants = {vk: empty_variant_steps() for vk, _ in VARIANTS}
+        artist_id = secrets.token_hex(8)
         return ArtistProgress(
             id=artist_id,
             label=label.strip(),
             order=order,
-            global_steps=empty_global_steps(),
-            variants=variants,
         )
 
+    @cached_property
+    def checkbox_keys(self) -> Tuple[str, ...]:
+        # widget keys in BIT_INDEX order; built once per object instead of per render
+        return tuple(self.id + sfx for sfx in CHECKBOX_KEY_SUFFIXES)
+
+    @cached_property
+    def label_lower(self) -> str:
+        return self.label.lower()
+
+    def is_done(self, variant_key: Optional[str], step_key: str) -> bool:
+        return bool(self.mask >> BIT_INDEX[(variant_key, step_key)] & 1)
+
+    def set_done(self, variant_key: Optional[str], step_key: str, value: bool) -> None:
+        bit = 1 << BIT_INDEX[(variant_key, step_key)]
+        if value:
+            self.mask |= bit
+        else:
+            self.mask &= ~bit
+
 
 # ===================== DB CRUD =====================
-def load_data() -> Dict[str, ArtistProgress]:
+SAVED_ROWS_KEY = "__saved_rows"
+DATA_VERSION_KEY = "__data_version"
+SESSION_DATA_KEY = "__data"
+SAVE_STATUS_KEY = "__save_status"
+LABEL_INDEX_KEY = "__norm_labels"
+SAVE_WAIT_SECONDS = 10
+
+
+def row_sig(ap: ArtistProgress) -> Tuple[str, int, int]:
+    return ap.label, ap.order, ap.mask
+
+
+def row_params(ap: ArtistProgress) -> Dict:
+    global_steps, variants = steps_from_mask(ap.mask)
+    return {
+        "id": ap.id,
+        "label": ap.label,
+        "order_num": ap.order,
+        "global_steps": json_dumps(global_steps),
+        "variants": json_dumps(variants),
+    }
+
+
+def read_fingerprint(session) -> Tuple[int, str]:
+    cnt, last = session.execute(
+        text("select count(*), max(updated_at) from artist_progress")
+    ).one()
+    return int(cnt), str(last)
+
+
+@st.cache_data(ttl=5, show_spinner=False)
+def data_fingerprint() -> Tuple[int, str]:
+    # cheap stand-in for a file mtime: any insert/update/delete moves one of these.
+    # Our own writes clear it right away; the ttl only bounds how long edits made elsewhere stay unseen.
     conn = get_conn()
-    data: Dict[str, ArtistProgress] = {}
+    with conn.session as session:
+        return read_fingerprint(session)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_rows_cached(fingerprint: Tuple[int, str]) -> List[Dict]:
+    conn = get_conn()
+    out: List[Dict] = []
 
     with conn.session as session:
         rows = session.execute(
@@ -152,33 +292,80 @@ def load_data() -> Dict[str, ArtistProgress]:
         g_in = _safe_json_to_dict(r["global_steps"])
         v_in = _safe_json_to_dict(r["variants"])
 
-        global_steps = empty_global_steps()
-        for gk, _ in GLOBAL_STEPS:
-            global_steps[gk] = bool(g_in.get(gk, False))
-
-        variants: Dict[str, Dict[str, bool]] = {}
-        for vk, _ in VARIANTS:
-            steps_in = v_in.get(vk, {})
-            if not isinstance(steps_in, dict):
-                steps_in = {}
-            steps = empty_variant_steps()
-            for sk, _ in COLUMN_STEPS:
-                steps[sk] = bool(steps_in.get(sk, False))
-            variants[vk] = steps
-
-        data[artist_id] = ArtistProgress(
-            id=artist_id,
-            label=label,
-            order=order,
-            global_steps=global_steps,
-            variants=variants,
-        )
+        out.append({
+            "id": artist_id,
+            "label": label,
+            "order": order,
+            "mask": mask_from_steps(g_in, v_in),
+        })
 
+    return out
+
+
+def invalidate_load_cache() -> None:
+    data_fingerprint.clear()
+    load_rows_cached.clear()
+
+
+def load_data() -> Dict[str, ArtistProgress]:
+    wait_for_saves()
+    report_failed_saves()
+    for before, after in save_status().pop("written", ()):
+        advance_session_data(before, after)
+    fingerprint = data_fingerprint()
+    st.session_state[DATA_VERSION_KEY] = fingerprint
+
+    # DB unchanged since this session last loaded: keep using the same objects (and their cached keys)
+    held = st.session_state.get(SESSION_DATA_KEY)
+    if held is not None and held[0] == fingerprint:
+        return held[1]
+
+    # st.cache_data hands back a fresh copy, so mutating these objects never touches the cache
+    data: Dict[str, ArtistProgress] = {
+        r["id"]: ArtistProgress(**r) for r in load_rows_cached(fingerprint)
+    }
+
+    # what the DB holds right now (after normalization); save_data skips rows that still match
+    st.session_state[SAVED_ROWS_KEY] = {aid: row_sig(ap) for aid, ap in data.items()}
+    st.session_state[SESSION_DATA_KEY] = (fingerprint, data)
+    # fresh objects may carry labels added or removed elsewhere
+    st.session_state.pop(LABEL_INDEX_KEY, None)
     return data
 
 
-def save_data(data: Dict[str, ArtistProgress]) -> None:
-    conn = get_conn()
+def pending_rows(data: Dict[str, ArtistProgress]) -> List[Dict]:
+    # rows that differ from the last loaded/saved state; marks them saved right away.
+    # A row whose only change is its order goes out as {"id", "order_num"} (no JSONB rebuild).
+    saved = st.session_state.setdefault(SAVED_ROWS_KEY, {})
+    rows: List[Dict] = []
+    for ap in data.values():
+        sig = row_sig(ap)
+        old = saved.get(ap.id)
+        if old == sig:
+            continue
+        if old is not None and (old[0], old[2]) == (sig[0], sig[2]):
+            rows.append({"id": ap.id, "order_num": ap.order})
+        else:
+            rows.append(row_params(ap))
+        saved[ap.id] = sig
+    return rows
+
+
+def merge_rows(batch: Dict[str, Dict], rows: List[Dict]) -> None:
+    for params in rows:
+        prev = batch.get(params["id"])
+        if prev is not None and "label" not in params:
+            prev["order_num"] = params["order_num"]
+        else:
+            batch[params["id"]] = params
+
+
+def write_rows(conn, rows: List[Dict]) -> Optional[Tuple[Tuple[int, str], Tuple[int, str]]]:
+    # returns the fingerprint just before and just after the write (same transaction)
+    if not rows:
+        return None
+    upserts = [params for params in rows if "label" in params]
+    reorders = [params for params in rows if "label" not in params]
 
     upsert_sql = text("""
         insert into artist_progress (id, label, order_num, global_steps, variants, updated_at)
@@ -190,50 +377,275 @@ def save_data(data: Dict[str, ArtistProgress]) -> None:
             variants = excluded.variants,
             updated_at = now()
     """)
+    reorder_sql = text("update artist_progress set order_num = :order_num, updated_at = now() where id = :id")
 
+    # one executemany per kind in one transaction: either every changed row lands or none does
     with conn.session as session:
-        for ap in data.values():
-            session.execute(
-                upsert_sql,
-                {
-                    "id": ap.id,
-                    "label": ap.label,
-                    "order_num": ap.order,
-                    "global_steps": json.dumps(ap.global_steps, ensure_ascii=False),
-                    "variants": json.dumps(ap.variants, ensure_ascii=False),
-                },
-            )
+        before = read_fingerprint(session)
+        if upserts:
+            session.execute(upsert_sql, upserts)
+        if reorders:
+            session.execute(reorder_sql, reorders)
+        after = read_fingerprint(session)
         session.commit()
+    invalidate_load_cache()
+    return before, after
+
+
+@st.cache_resource
+def save_queue() -> "queue.Queue":
+    # one writer thread per process, so background saves land in the order they were scheduled
+    q: queue.Queue = queue.Queue()
+
+    def worker() -> None:
+        while True:
+            items = [q.get()]
+            try:
+                # coalesce whatever piled up meanwhile: one transaction, latest row per artist wins
+                while True:
+                    try:
+                        items.append(q.get_nowait())
+                    except queue.Empty:
+                        break
+                batch: Dict[str, Dict] = {}
+                for _, rows, _ in items:
+                    merge_rows(batch, rows)
+                fingerprints = write_rows(items[0][0], list(batch.values()))
+                owners = {id(status): status for _, _, status in items}
+                if fingerprints and len(owners) == 1:
+                    # only one session's rows went in, so its held objects still match the DB
+                    for status in owners.values():
+                        status.setdefault("written", []).append(fingerprints)
+            except Exception:
+                traceback.print_exc()
+                # tell each scheduling session which of its rows never made it
+                for _, rows, status in items:
+                    status.setdefault("failed_ids", set()).update(params["id"] for params in rows)
+            finally:
+                for _, _, status in items:
+                    finish_save(status)
+                    q.task_done()
+
+    threading.Thread(target=worker, daemon=True).start()
+    return q
+
+
+def save_status() -> Dict:
+    # plain dict shared with the writer thread: this session's queued batch count and failed saves
+    status = st.session_state.get(SAVE_STATUS_KEY)
+    if status is None:
+        status = {"lock": threading.Lock(), "pending": 0, "idle": threading.Event()}
+        status["idle"].set()
+        st.session_state[SAVE_STATUS_KEY] = status
+    return status
+
+
+def finish_save(status: Dict) -> None:
+    with status["lock"]:
+        status["pending"] -= 1
+        if not status["pending"]:
+            status["idle"].set()
+
+
+def wait_for_saves() -> bool:
+    # only this session's own batches; a slow write from another session must not hold this rerun
+    if save_status()["idle"].wait(SAVE_WAIT_SECONDS):
+        return True
+    st.error("Önceki değişiklikler hâlâ kaydediliyor; gösterilen veriler güncel olmayabilir.")
+    return False
+
+
+def forget_session_data() -> None:
+    # a write failed, so the in-memory rows may hold changes the DB never got: reload on next use
+    st.session_state.pop(SESSION_DATA_KEY, None)
+    st.session_state.pop(SAVED_ROWS_KEY, None)
+
+
+def advance_session_data(before: Tuple[int, str], after: Tuple[int, str]) -> None:
+    # this session's own write moved the DB from `before` to `after`; the held objects already
+    # carry that change, so keep them instead of reloading every row on the next rerun
+    held = st.session_state.get(SESSION_DATA_KEY)
+    if held is not None and held[0] == before:
+        st.session_state[SESSION_DATA_KEY] = (after, held[1])
+
+
+def report_failed_saves() -> None:
+    failed = save_status().pop("failed_ids", None)
+    if not failed:
+        return
+    forget_session_data()
+    for aid in failed:
+        # the checkboxes still show the unsaved ticks; let them re-read what the DB holds
+        for sfx in CHECKBOX_KEY_SUFFIXES:
+            st.session_state.pop(aid + sfx, None)
+    st.error("Son değişikliklerin bir kısmı veritabanına kaydedilemedi.")
+
+
+def schedule_save(data: Dict[str, ArtistProgress]) -> None:
+    rows = pending_rows(data)
+    if not rows:
+        return
+    status = save_status()
+    with status["lock"]:
+        status["pending"] += 1
+        status["idle"].clear()
+    save_queue().put((get_conn(), rows, status))
+
+
+def save_data(data: Dict[str, ArtistProgress]) -> None:
+    if not wait_for_saves():
+        # writing now could land before (and be overwritten by) this session's queued batches
+        forget_session_data()
+        st.stop()
+    rows = pending_rows(data)
+    if not rows:
+        return
+    try:
+        fingerprints = write_rows(get_conn(), rows)
+    except Exception:
+        forget_session_data()
+        raise
+    if fingerprints:
+        advance_session_data(*fingerprints)
 
 
 def delete_artist_db(artist_id: str) -> None:
+    if not wait_for_saves():
+        st.stop()
     conn = get_conn()
     with conn.session as session:
+        before = read_fingerprint(session)
         session.execute(text("delete from artist_progress where id = :id"), {"id": artist_id})
+        after = read_fingerprint(session)
         session.commit()
+    invalidate_load_cache()
+    st.session_state.get(SAVED_ROWS_KEY, {}).pop(artist_id, None)
+    # the caller drops the artist from the held dict right after this
+    advance_session_data(before, after)
 
 
 def truncate_all_db() -> None:
+    if not wait_for_saves():
+        st.stop()
     conn = get_conn()
     with conn.session as session:
         session.execute(text("truncate table artist_progress"))
         session.commit()
+    invalidate_load_cache()
+    st.session_state.pop(SAVED_ROWS_KEY, None)
 
 
 # ===================== Logic =====================
 def calc_done_total(ap: ArtistProgress) -> Tuple[int, int]:
-    done = 0
-    total = 0
-    for gk, _ in GLOBAL_STEPS:
-        total += 1
-        if ap.global_steps.get(gk, False):
-            done += 1
-    for vk, _ in VARIANTS:
-        for sk, _ in COLUMN_STEPS:
-            total += 1
-            if ap.variants.get(vk, {}).get(sk, False):
-                done += 1
-    return done, total
+    # bin().count rather than int.bit_count(), which needs Python 3.10+
+    return bin(ap.mask).count("1"), TOTAL_BITS
+
+
+def toggle_step(
+    data: Dict[str, ArtistProgress],
+    ap: ArtistProgress,
+    variant_key: Optional[str],
+    step_key: str,
+    widget_key: str,
+) -> None:
+    # checkbox on_change: Streamlit only calls this when the value really changed
+    ap.set_done(variant_key, step_key, bool(st.session_state[widget_key]))
+    schedule_save(data)
+
+
+FILTER_CACHE_KEY = "__filter_cache"
+MAIN_SORT_KEY = "__main_sort"
+
+
+def filter_artist_ids(data: Dict[str, ArtistProgress], q: str, mode: str) -> Tuple[str, ...]:
+    # memoized in session_state (module state is rebuilt every rerun), keyed by DB version + inputs
+    cache_key = (st.session_state.get(DATA_VERSION_KEY), q, mode)
+    cached = st.session_state.get(FILTER_CACHE_KEY)
+    if cached is not None and cached[0] == cache_key:
+        return cached[1]
+
+    artists = list(data.values())
+    if q.strip():
+        qq = q.strip().lower()
+        artists = [a for a in artists if qq in a.label_lower]
+
+    if mode == "Sadece tamamlanmamışlar":
+        artists = [a for a in artists if a.mask != ALL_BITS]
+    elif mode == "Sadece tamamlanmışlar":
+        artists = [a for a in artists if a.mask == ALL_BITS]
+
+    ids = tuple(a.id for a in artists)
+    st.session_state[FILTER_CACHE_KEY] = (cache_key, ids)
+    return ids
+
+
+def set_artist_all(data: Dict[str, ArtistProgress], ap: ArtistProgress, value: bool) -> None:
+    ap.mask = ALL_BITS if value else 0
+    data[ap.id] = ap
+    schedule_save(data)
+    set_artist_all_session_state(ap, value)
+
+
+def label_index(data: Dict[str, ArtistProgress]) -> Set[str]:
+    # normalized labels, built on first add; kept up to date in place until load_data reloads the rows
+    index = st.session_state.get(LABEL_INDEX_KEY)
+    if index is None:
+        index = {norm(ap.label) for ap in data.values()}
+        st.session_state[LABEL_INDEX_KEY] = index
+    return index
+
+
+def _increasing_run(orders: List[int]) -> Set[int]:
+    # positions of a longest strictly increasing subsequence; those rows can keep their order
+    tail_vals: List[int] = []
+    tail_pos: List[int] = []
+    prev = [-1] * len(orders)
+    for i, o in enumerate(orders):
+        k = bisect_left(tail_vals, o)
+        prev[i] = tail_pos[k - 1] if k else -1
+        if k == len(tail_vals):
+            tail_vals.append(o)
+            tail_pos.append(i)
+        else:
+            tail_vals[k] = o
+            tail_pos[k] = i
+
+    kept: Set[int] = set()
+    i = tail_pos[-1] if tail_pos else -1
+    while i != -1:
+        kept.add(i)
+        i = prev[i]
+    return kept
+
+
+def sparse_orders(orders: List[int]) -> Optional[List[int]]:
+    # `orders` is in the wanted display sequence; only rows off the increasing run get a new
+    # value (midpoint of their neighbours). None = no free slot, caller re-spaces everything.
+    kept = _increasing_run(orders)
+
+    next_kept: List[Optional[int]] = [None] * len(orders)
+    nxt: Optional[int] = None
+    for i in range(len(orders) - 1, -1, -1):
+        next_kept[i] = nxt
+        if i in kept:
+            nxt = orders[i]
+
+    out = list(orders)
+    lo: Optional[int] = None
+    for i, o in enumerate(orders):
+        if i not in kept:
+            hi = next_kept[i]
+            if lo is None:
+                o = hi - ORDER_GAP
+            elif hi is None:
+                o = lo + ORDER_GAP
+            elif hi - lo < 2:
+                return None
+            else:
+                o = (lo + hi) // 2
+            out[i] = o
+        lo = o
+    return out
 
 
 def apply_order_from_id_list(data: Dict[str, ArtistProgress], ordered_ids: List[str]) -> bool:
@@ -247,14 +659,18 @@ def apply_order_from_id_list(data: Dict[str, ArtistProgress], ordered_ids: List[
         if i not in seen:
             new_list.append(i)
 
+    orders = sparse_orders([data[i].order for i in new_list])
+    if orders is None:
+        orders = [ORDER_GAP * n for n in range(1, len(new_list) + 1)]
+
     changed = False
-    for idx, artist_id in enumerate(new_list, start=1):
-        if data[artist_id].order != idx:
-            data[artist_id].order = idx
+    for artist_id, order in zip(new_list, orders):
+        if data[artist_id].order != order:
+            data[artist_id].order = order
             changed = True
 
     if changed:
-        save_data(data)
+        schedule_save(data)
     return changed
 
 
@@ -277,6 +693,7 @@ if "artist_sort_key_v" not in st.session_state:
     st.session_state["artist_sort_key_v"] = 0
 
 data = load_data()
+ordered = sorted(data.values(), key=lambda a: a.order)
 
 with st.sidebar:
     st.header("➕ Sanatçı ekle")
@@ -289,13 +706,16 @@ with st.sidebar:
         if not name:
             st.warning("İsim boş olamaz.")
         else:
-            if any(norm(ap.label) == norm(name) for ap in data.values()):
+            name_key = norm(name)
+            norm_labels = label_index(data)
+            if name_key in norm_labels:
                 st.warning("Bu sanatçı zaten listede var.")
             else:
                 max_order = max((ap.order for ap in data.values()), default=0)
-                ap = ArtistProgress.new(label=name, order=max_order + 1)
+                ap = ArtistProgress.new(label=name, order=max_order + ORDER_GAP)
                 data[ap.id] = ap
                 save_data(data)
+                norm_labels.add(name_key)
                 bump_sort_key()
                 toast("Eklendi ✅")
                 force_rerun()
@@ -306,15 +726,14 @@ with st.sidebar:
     if not data:
         st.info("Liste boş. Önce sanatçı ekle.")
     else:
-        ordered = sorted(data.values(), key=lambda a: a.order)
         ordered_ids = [a.id for a in ordered]
 
         if SORTABLES_OK:
             st.caption("Sürükle-bırak ile sırala:")
             sort_key = f"artist_sort_{st.session_state['artist_sort_key_v']}"
 
-            display = [f"{a.label}  ⟦{a.id[:8]}⟧" for a in ordered]
             display_to_id = {f"{a.label}  ⟦{a.id[:8]}⟧": a.id for a in ordered}
+            display = list(display_to_id)
 
             try:
                 new_display = sort_items(display, direction="vertical", key=sort_key)
@@ -375,47 +794,51 @@ with st.sidebar:
 
 
 # ======= Main list =======
-artists = list(data.values())
-
-if q.strip():
-    qq = q.strip().lower()
-    artists = [a for a in artists if qq in a.label.lower()]
+artists = [data[i] for i in filter_artist_ids(data, q, filter_mode) if i in data]
 
-if filter_mode != "Hepsi":
-    if filter_mode == "Sadece tamamlanmamışlar":
-        artists = [a for a in artists if calc_done_total(a)[0] < calc_done_total(a)[1]]
-    else:
-        artists = [a for a in artists if calc_done_total(a)[0] == calc_done_total(a)[1]]
-
-if sort_mode == "Liste sırası":
-    artists.sort(key=lambda a: a.order)
-elif sort_mode == "Başlık (A→Z)":
-    artists.sort(key=lambda a: a.label.lower())
+view_sig = (st.session_state.get(DATA_VERSION_KEY), q, filter_mode, sort_mode)
+cached_view = st.session_state.get(MAIN_SORT_KEY)
+if cached_view is not None and cached_view[0] == view_sig:
+    # same data and same view settings as the last rerun: reuse its order instead of sorting
+    artists = [data[i] for i in cached_view[1] if i in data]
 else:
-    artists.sort(key=lambda a: calc_done_total(a)[0] / max(1, calc_done_total(a)[1]), reverse=True)
+    if sort_mode == "Liste sırası":
+        # reuse the list-order sort from the sidebar; set lookup keeps this O(N)
+        visible_ids = {a.id for a in artists}
+        artists = [a for a in ordered if a.id in visible_ids]
+    elif sort_mode == "Başlık (A→Z)":
+        artists.sort(key=lambda a: a.label_lower)
+    else:
+        # every artist has the same TOTAL_BITS steps, so done count orders the same as done/total
+        artists.sort(key=lambda a: calc_done_total(a)[0], reverse=True)
+    st.session_state[MAIN_SORT_KEY] = (view_sig, tuple(a.id for a in artists))
 
-overall_done = 0
-overall_total = 0
-for a in artists:
-    d, t = calc_done_total(a)
-    overall_done += d
-    overall_total += t
-
-st.progress(0 if overall_total == 0 else overall_done / overall_total)
-st.caption(f"Genel ilerleme: {overall_done}/{overall_total} adım tamamlandı")
+# filled in after the card loop, which sums the done counts as it renders
+progress_slot = st.empty()
+caption_slot = st.empty()
 st.markdown("---")
 
+
+def show_overall(overall_done: int, overall_total: int) -> None:
+    progress_slot.progress(0 if overall_total == 0 else overall_done / overall_total)
+    caption_slot.caption(f"Genel ilerleme: {overall_done}/{overall_total} adım tamamlandı")
+
+
 if not artists:
+    show_overall(0, 0)
     st.info("Liste boş. Soldan sanatçı ekleyebilirsin.")
     st.stop()
 
-for ap in artists:
+
+@fragment
+def render_artist(ap: ArtistProgress, data: Dict[str, ArtistProgress]) -> None:
     done, total = calc_done_total(ap)
     pct = 0 if total == 0 else done / total
     artist_id = ap.id
 
     with st.container(border=True):
-        top_l, top_m, top_r = st.columns([3, 2, 2])
+        # title, progress and the four buttons share one st.columns row (no nested columns)
+        top_l, top_m, b1, b2, b3, b4 = st.columns([3, 2, 0.5, 0.5, 0.5, 0.5])
 
         with top_l:
             st.subheader(ap.label)
@@ -424,93 +847,102 @@ for ap in artists:
             st.progress(pct)
             st.caption(f"{int(pct*100)}% ({done}/{total})")
 
-        with top_r:
-            b1, b2, b3, b4 = st.columns([1, 1, 1, 1])
-
-            with b1:
-                if st.button("Hepsi ✅", key=f"btn_all_{artist_id}"):
-                    ap.global_steps = {k: True for k, _ in GLOBAL_STEPS}
-                    for vk, _ in VARIANTS:
-                        ap.variants[vk] = {sk: True for sk, _ in COLUMN_STEPS}
-                    data[artist_id] = ap
-                    save_data(data)
-                    set_artist_all_session_state(artist_id, True)
-                    force_rerun()
-
-            with b2:
-                if st.button("Hepsi ⬜", key=f"btn_none_{artist_id}"):
-                    ap.global_steps = {k: False for k, _ in GLOBAL_STEPS}
-                    for vk, _ in VARIANTS:
-                        ap.variants[vk] = {sk: False for sk, _ in COLUMN_STEPS}
-                    data[artist_id] = ap
-                    save_data(data)
-                    set_artist_all_session_state(artist_id, False)
-                    force_rerun()
-
-            with b3:
-                if st.button("Sıfırla", key=f"btn_reset_{artist_id}"):
-                    ap.global_steps = {k: False for k, _ in GLOBAL_STEPS}
-                    for vk, _ in VARIANTS:
-                        ap.variants[vk] = {sk: False for sk, _ in COLUMN_STEPS}
-                    data[artist_id] = ap
-                    save_data(data)
-                    set_artist_all_session_state(artist_id, False)
-                    force_rerun()
+        with b1:
+            if st.button(
+                "Hepsi ✅",
+                key=f"btn_all_{artist_id}",
+                on_click=set_artist_all,
+                args=(data, ap, True),
+            ):
+                # the callback already applied it; rerun the whole app so totals, filter and sort follow
+                force_rerun()
 
-            with b4:
-                del_flag = st.session_state.get(f"del_confirm_{artist_id}", False)
-                if not del_flag:
-                    if st.button("🗑", key=f"btn_del_{artist_id}"):
-                        st.session_state[f"del_confirm_{artist_id}"] = True
-                        force_rerun()
-                else:
-                    if st.button("Onayla", key=f"btn_del_ok_{artist_id}"):
-                        for gk, _ in GLOBAL_STEPS:
-                            st.session_state.pop(checkbox_key(artist_id, None, gk), None)
-                        for vk, _ in VARIANTS:
-                            for sk, _ in COLUMN_STEPS:
-                                st.session_state.pop(checkbox_key(artist_id, vk, sk), None)
+        with b2:
+            if st.button(
+                "Hepsi ⬜",
+                key=f"btn_none_{artist_id}",
+                on_click=set_artist_all,
+                args=(data, ap, False),
+            ):
+                force_rerun()
 
-                        delete_artist_db(artist_id)
-                        data.pop(artist_id, None)
+        with b3:
+            if st.button(
+                "Sıfırla",
+                key=f"btn_reset_{artist_id}",
+                on_click=set_artist_all,
+                args=(data, ap, False),
+            ):
+                force_rerun()
 
-                        bump_sort_key()
-                        st.session_state.pop(f"del_confirm_{artist_id}", None)
-                        toast("Silindi 🗑️")
-                        force_rerun()
+        with b4:
+            del_flag = st.session_state.get(f"del_confirm_{artist_id}", False)
+            if not del_flag:
+                st.button(
+                    "🗑",
+                    key=f"btn_del_{artist_id}",
+                    on_click=set_delete_confirm,
+                    args=(artist_id, True),
+                )
+            else:
+                if st.button("Onayla", key=f"btn_del_ok_{artist_id}"):
+                    for k in ap.checkbox_keys:
+                        st.session_state.pop(k, None)
+
+                    delete_artist_db(artist_id)
+                    data.pop(artist_id, None)
+                    index = st.session_state.get(LABEL_INDEX_KEY)
+                    if index is not None:
+                        index.discard(norm(ap.label))
+
+                    bump_sort_key()
+                    set_delete_confirm(artist_id, False)
+                    toast("Silindi 🗑️")
+                    force_rerun()
 
-                    if st.button("Vazgeç", key=f"btn_del_cancel_{artist_id}"):
-                        st.session_state.pop(f"del_confirm_{artist_id}", None)
-                        force_rerun()
+                st.button(
+                    "Vazgeç",
+                    key=f"btn_del_cancel_{artist_id}",
+                    on_click=set_delete_confirm,
+                    args=(artist_id, False),
+                )
 
         st.markdown("**Genel (sanatçı için tek seferlik):**")
         gcols = st.columns(3)
-        changed = False
+        keys = ap.checkbox_keys
 
         for i, (gk, glabel) in enumerate(GLOBAL_STEPS):
             with gcols[i % 3]:
-                k = checkbox_key(artist_id, None, gk)
-                ensure_checkbox_state(k, ap.global_steps.get(gk, False))
-                nv = st.checkbox(glabel, key=k)
-                if nv != ap.global_steps.get(gk, False):
-                    ap.global_steps[gk] = nv
-                    changed = True
-
-        st.markdown("---")
-        st.markdown("**Varyantlar:**")
+                k = keys[BIT_INDEX[(None, gk)]]
+                ensure_checkbox_state(k, ap.is_done(None, gk))
+                st.checkbox(glabel, key=k, on_change=toggle_step, args=(data, ap, None, gk, k))
+
+        st.markdown("---\n\n**Varyantlar:**")
         vcols = st.columns(len(VARIANTS))
 
         for idx, (vk, vlabel) in enumerate(VARIANTS):
             with vcols[idx]:
                 st.markdown(f"### {vlabel}")
                 for sk, slabel in COLUMN_STEPS:
-                    k = checkbox_key(artist_id, vk, sk)
-                    ensure_checkbox_state(k, ap.variants.get(vk, {}).get(sk, False))
-                    nv = st.checkbox(slabel, key=k)
-                    if nv != ap.variants[vk].get(sk, False):
-                        ap.variants[vk][sk] = nv
-                        changed = True
-
-        if changed:
-            data[artist_id] = ap
-            save_data(data)
+                    k = keys[BIT_INDEX[(vk, sk)]]
+                    ensure_checkbox_state(k, ap.is_done(vk, sk))
+                    st.checkbox(slabel, key=k, on_change=toggle_step, args=(data, ap, vk, sk, k))
+
+
+page_count = (len(artists) + PAGE_SIZE - 1) // PAGE_SIZE
+page = 1
+if page_count > 1:
+    if int(st.session_state.get("page", 1)) > page_count:
+        st.session_state["page"] = page_count
+    page = int(st.number_input("Sayfa", min_value=1, max_value=page_count, step=1, key="page"))
+    st.caption(f"{len(artists)} sanatçı, sayfa {page}/{page_count}")
+page_start = (page - 1) * PAGE_SIZE
+page_end = page_start + PAGE_SIZE
+
+overall_done = 0
+for idx, ap in enumerate(artists):
+    overall_done += calc_done_total(ap)[0]
+    if page_start <= idx < page_end:
+        render_artist(ap, data)
+
+show_overall(overall_done, TOTAL_BITS * len(artists))